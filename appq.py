@@ -1,31 +1,28 @@
 
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 
+from data_loader import load_data
+
 # Title
 st.title("Childcare Costs in America (2008–2018)")
 st.markdown("An interactive dashboard based on the National Database of Childcare Prices (NDCP).")
 
-# Load data
-@st.cache_data
-def load_data():
-    url = "https://raw.githubusercontent.com/plotly/datasets/master/2011_us_ag_exports.csv"  # placeholder
-    return pd.read_csv(url)
+# Load data through the shared cached loader (one cache entry per process,
+# no matter which app script runs first)
+loaded = load_data('nationaldatabaseofchildcare_sampled.csv')
+if loaded is None:
+    st.error("Data could not be loaded. Please check the file and column names.")
+    st.stop()
 
-# Simulated placeholder data (replace with real dataset in actual deployment)
-data = pd.DataFrame({
-    "Year": list(range(2008, 2019)) * 3,
-    "Age Group": ["Infant"] * 11 + ["Toddler"] * 11 + ["Preschool"] * 11,
-    "Weekly Cost": [97 + i*1.5 for i in range(11)] + [90 + i*1.4 for i in range(11)] + [88 + i*1.2 for i in range(11)]
-})
+_, _, nat_agg, _, _, _ = loaded
 
 # Sidebar filter
-age_group = st.sidebar.selectbox("Select Age Group", data["Age Group"].unique())
-filtered = data[data["Age Group"] == age_group]
+age_group = st.sidebar.selectbox("Select Age Group", nat_agg['age_group'].cat.categories)
+filtered = nat_agg[nat_agg['age_group'] == age_group]
 
 # Line chart
-fig = px.line(filtered, x="Year", y="Weekly Cost", title=f"Weekly {age_group} Care Cost (75th Percentile)")
+fig = px.line(filtered, x="year", y="weekly_cost", title=f"Weekly {age_group} Care Cost (75th Percentile)")
 st.plotly_chart(fig)
 
 # Footer
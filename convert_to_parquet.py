@@ -0,0 +1,39 @@
+"""
+One-shot converter for the NDCP sampled dataset.
+
+Reads the raw CSV, normalizes column names, compacts dtypes, and writes a
+zstd-compressed Parquet file next to it. The dashboard prefers the Parquet
+file when present, which skips CSV tokenization on every cold load.
+
+Run once: python convert_to_parquet.py
+"""
+import pandas as pd
+
+from data_loader import _COST_COL_RE
+
+CSV_PATH = 'nationaldatabaseofchildcare_sampled.csv'
+PARQUET_PATH = 'nationaldatabaseofchildcare_sampled.parquet'
+
+
+def main():
+    df = pd.read_csv(CSV_PATH, encoding='latin1')
+    # Match the cleaning done in the app so both paths see the same schema
+    df.columns = df.columns.str.lower()
+
+    # Dictionary-encode the low-cardinality string columns
+    for col in ('state_name', 'state_abbreviation', 'county_name'):
+        df[col] = df[col].astype('category')
+
+    # Cost columns only need float32 precision for dashboard aggregation.
+    # Shares the loader's pattern so both sides agree on what a cost column
+    # is (75th-percentile FCC only — not the mfcc medians or flag columns).
+    cost_cols = [col for col in df.columns if _COST_COL_RE.match(col)]
+    df[cost_cols] = df[cost_cols].astype('float32')
+
+    df.to_parquet(PARQUET_PATH, engine='pyarrow', compression='zstd',
+                  row_group_size=50_000)
+    print(f"Wrote {PARQUET_PATH} ({len(df)} rows, {len(df.columns)} columns)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""
+Shared data loading for the dashboard entry points.
+
+Every app script routes through the single cached load_data below, so the
+cleaned frame and its aggregate tables exist once per Streamlit process no
+matter how many pages import them.
+
+The pipeline is deliberately a single pass over columnar data: a projected
+Parquet read, one fused NaN mask, and column-wise aggregation of the wide
+cost matrix (jitted when numba is available). There is no melt, no per-row
+string parsing, and no intermediate long copy, which is the same fusion a
+lazy query engine would apply — without adding one as a dependency.
+"""
+import glob
+import os
+import re
+
+import numpy as np
+import streamlit as st
+import pandas as pd
+import pyarrow.parquet as pq
+
+try:
+    from numba import njit
+    _HAVE_NUMBA = True
+except ImportError:
+    _HAVE_NUMBA = False
+
+# Compiled once at import; matches exactly the 75th-percentile family-child-
+# care cost columns. Anchored so the 0/1 quality-flag columns and the median
+# (mfcc*) columns never leak into the "75th percentile" averages.
+_COST_COL_RE = re.compile(r'^_75fcc(?:infant|toddler|preschool)$')
+
+# Age-group label for each cost column the pattern above can match
+_AGE_BY_COST_COL = {
+    '_75fccinfant': 'Infant',
+    '_75fcctoddler': 'Toddler',
+    '_75fccpreschool': 'Preschool',
+}
+
+
+def state_option_list(df_clean):
+    """Sidebar options: the category index is already unique and sorted."""
+    return ('All', *df_clean['state_name'].cat.categories)
+
+
+def build_kpi_table(agg, nat_agg):
+    """
+    (state_name, year) x age_group pivot of mean weekly cost with an 'All'
+    rollup, so the KPI cards read all three values with one .loc row lookup
+    instead of a filter + groupby per rerun.
+    """
+    by_state = agg.set_index(['state_name', 'year', 'age_group'])['weekly_cost']
+    national = nat_agg.assign(state_name='All').set_index(
+        ['state_name', 'year', 'age_group'])['weekly_cost']
+    return pd.concat([by_state, national]).unstack('age_group').sort_index()
+
+
+if _HAVE_NUMBA:
+    # cache=True persists the compiled binary on disk, so the jit cost is
+    # paid once rather than on every app restart.
+    @njit(cache=True)
+    def _group_mean_wide(year_codes, cost_mat, n_years):
+        # One pass over the wide (rows x ages) cost matrix; NaN cells are
+        # skipped the same way a column-wise pandas mean would skip them.
+        n_ages = cost_mat.shape[1]
+        sums = np.zeros((n_years, n_ages))
+        counts = np.zeros((n_years, n_ages), np.int64)
+        for i in range(year_codes.size):
+            yc = year_codes[i]
+            for j in range(n_ages):
+                v = cost_mat[i, j]
+                if not np.isnan(v):
+                    sums[yc, j] += v
+                    counts[yc, j] += 1
+        return sums / counts
+
+
+def state_year_age_mean(df_wide, age_cols):
+    """
+    Mean weekly cost per (year, state, age_group) as a tidy frame — the
+    table every chart and KPI derives from.
+
+    Reuses the jitted accumulator with a fused (year, state) key: the
+    combined integer codes turn the two-level groupby into one pass over
+    the wide cost matrix, skipping pandas' general groupby bookkeeping.
+    Falls back to the equivalent pandas groupby without numba.
+    """
+    if not _HAVE_NUMBA:
+        state_means = df_wide.groupby(
+            ['year', 'state_name', 'state_abbreviation'], observed=True
+        )[age_cols].mean()
+        state_means.columns.name = 'age_group'
+        out = state_means.stack().rename('weekly_cost').reset_index()
+        out.dropna(subset=['weekly_cost'], inplace=True)
+        out['weekly_cost'] = out['weekly_cost'].astype('float32')
+        out['age_group'] = out['age_group'].astype('category')
+        return out.reset_index(drop=True)
+
+    state_cat = df_wide['state_name'].array
+    n_states = len(state_cat.categories)
+    years, year_codes = np.unique(df_wide['year'].to_numpy(), return_inverse=True)
+    combined = year_codes.astype(np.int64) * n_states + state_cat.codes
+    means = _group_mean_wide(
+        combined.astype(np.int64),
+        df_wide[age_cols].to_numpy(dtype=np.float32),
+        len(years) * n_states,
+    )
+
+    # state_name and state_abbreviation are parallel columns, so the code of
+    # one indexes a lookup table for the other.
+    abbr = np.empty(n_states, dtype=object)
+    abbr[state_cat.codes] = df_wide['state_abbreviation'].to_numpy()
+
+    n_ages = len(age_cols)
+    out = pd.DataFrame({
+        'year': np.repeat(years, n_states * n_ages),
+        'state_code': np.tile(np.repeat(np.arange(n_states), n_ages), len(years)),
+        'age_group': np.tile(np.asarray(age_cols, dtype=object), len(years) * n_states),
+        'weekly_cost': means.ravel().astype(np.float32),
+    })
+    # (year, state) pairs with no data at all come back NaN from 0/0
+    out.dropna(subset=['weekly_cost'], inplace=True)
+    codes = out.pop('state_code').to_numpy()
+    out['state_name'] = pd.Categorical.from_codes(codes, categories=state_cat.categories)
+    out['state_abbreviation'] = pd.Categorical(abbr[codes])
+    out['age_group'] = out['age_group'].astype('category')
+    return out[['year', 'state_name', 'state_abbreviation',
+                'age_group', 'weekly_cost']].reset_index(drop=True)
+
+
+def year_age_mean(df_wide, age_cols):
+    """
+    Mean weekly cost per (year, age_group) as a tidy frame, computed
+    straight off the wide frame so no long copy is scanned.
+
+    Uses the jitted accumulator when numba is available; otherwise falls
+    back to the equivalent pandas groupby.
+    """
+    if not _HAVE_NUMBA:
+        means = df_wide.groupby('year', observed=True)[age_cols].mean()
+        means.columns.name = 'age_group'
+        out = means.stack().rename('weekly_cost').reset_index()
+        out['weekly_cost'] = out['weekly_cost'].astype('float32')
+        out['age_group'] = out['age_group'].astype('category')
+        return out
+
+    years, year_codes = np.unique(df_wide['year'].to_numpy(), return_inverse=True)
+    means = _group_mean_wide(
+        year_codes.astype(np.int64),
+        df_wide[age_cols].to_numpy(dtype=np.float32),
+        len(years),
+    )
+    out = pd.DataFrame({
+        'year': np.repeat(years, len(age_cols)),
+        'age_group': np.tile(np.asarray(age_cols, dtype=object), len(years)),
+        # Back to float32: the accumulator runs in float64 for precision,
+        # but downstream tables keep the cost columns at display precision.
+        'weekly_cost': means.ravel().astype(np.float32),
+    })
+    # Empty (year, age) cells come back as NaN from the 0/0 division
+    out.dropna(subset=['weekly_cost'], inplace=True)
+    out['age_group'] = out['age_group'].astype('category')
+    return out.reset_index(drop=True)
+
+
+# --- Data Loading and Caching ---
+# cache_resource, not cache_data: cache_data deep-copies the cached value on
+# every access for mutation safety, which for these frames means re-copying
+# megabytes on each rerun. The identity cache returns the shared objects
+# directly — callers must treat every frame in the tuple as read-only (they
+# do: all of them are only ever sliced or aggregated).
+@st.cache_resource(show_spinner=False)
+def load_data(file_path):
+    """
+    Loads data from the sampled CSV file, cleans, and reshapes it.
+
+    The returned frames are shared across reruns and sessions; never
+    mutate them in place.
+    """
+    # FIX: Include 'studyyear' in the base columns as it contains the year information.
+    base_cols = ['state_name', 'state_abbreviation', 'county_name', 'studyyear']
+
+    def find_cost_cols(columns):
+        # Identify cost columns based on a flexible pattern; the vectorized
+        # string match runs in C instead of looping column names in Python.
+        columns = pd.Index(columns)
+        return columns[columns.str.contains(_COST_COL_RE)].tolist()
+
+    # Prefer the Parquet version (see convert_to_parquet.py): it skips CSV
+    # tokenization and, being columnar, reads only the columns we ask for.
+    parquet_path = os.path.splitext(file_path)[0] + '.parquet'
+
+    # On-disk result cache: st.cache_data only lives as long as the process,
+    # so a restarted worker would otherwise redo the full parse + reshape.
+    # The key ties the cached frames to the source file's identity.
+    src_path = parquet_path if os.path.exists(parquet_path) else file_path
+    cache_paths = None
+    if os.path.exists(src_path):
+        stat = os.stat(src_path)
+        cache_key = f'{stat.st_mtime_ns:x}_{stat.st_size:x}'
+        cache_paths = {
+            name: os.path.join('.cache', f'{name}_{cache_key}.parquet')
+            for name in ('wide', 'agg', 'nat_agg')
+        }
+        if all(os.path.exists(p) for p in cache_paths.values()):
+            try:
+                df_wide = pd.read_parquet(cache_paths['wide'], engine='pyarrow')
+                agg = pd.read_parquet(cache_paths['agg'], engine='pyarrow')
+                nat_agg = pd.read_parquet(cache_paths['nat_agg'], engine='pyarrow')
+                state_options = state_option_list(df_wide)
+                year_bounds = (int(nat_agg['year'].min()), int(nat_agg['year'].max()))
+                return (df_wide, agg, nat_agg, state_options, year_bounds,
+                        build_kpi_table(agg, nat_agg))
+            except Exception:
+                # A corrupt or stale cache file just means we rebuild it
+                pass
+
+    try:
+        if os.path.exists(parquet_path):
+            cost_cols = find_cost_cols(pq.read_schema(parquet_path).names)
+            df = pd.read_parquet(
+                parquet_path,
+                columns=base_cols + cost_cols,
+                engine='pyarrow',
+                use_threads=True,
+            )
+        else:
+            # The pyarrow engine parses the CSV multithreaded in C++; the
+            # Arrow dtype backend keeps the string columns Arrow-backed
+            # regardless of the pandas default, which the wide-frame build
+            # below relies on to avoid re-hashing them.
+            df = pd.read_csv(file_path, encoding='latin1', engine='pyarrow',
+                             dtype_backend='pyarrow')
+            # Convert all column names to lowercase to prevent KeyErrors
+            df.columns = df.columns.str.lower()
+            cost_cols = find_cost_cols(df.columns)
+    except FileNotFoundError:
+        st.error(f"Error: The file '{file_path}' was not found. Please make sure it's in the correct directory.")
+        return None
+    except Exception as e:
+        st.error(f"An error occurred while loading the data: {e}")
+        return None
+
+
+    if not all(col in df.columns for col in base_cols) or not cost_cols:
+        st.error("The data file is missing required columns (e.g., 'state_name', 'studyyear', or cost data).")
+        return None
+
+    # Keep the wide format: the dashboard only ever aggregates per age
+    # group, so reshaping to one-row-per-(row, age) would triple the row
+    # count and the memory traffic of every downstream pass. Rename the
+    # cost columns to their age labels and aggregate them column-wise.
+    ages = [_AGE_BY_COST_COL[col] for col in cost_cols]
+    costs = df[cost_cols].to_numpy(dtype=np.float32)
+
+    # FIX: Use the 'studyyear' column for the year.
+    studyyear = pd.to_numeric(df['studyyear'], errors='coerce').to_numpy()
+
+    # Drop rows with no year or no cost at all; rows missing only some age
+    # groups stay, since the column-wise means skip NaN cells. The
+    # OR-then-invert form with in-place ops allocates a single temporary.
+    keep = ~np.isnan(costs).all(axis=1)
+    if studyyear.dtype.kind == 'f':
+        year_missing = np.isnan(studyyear)
+        np.logical_not(year_missing, out=year_missing)
+        keep &= year_missing
+
+    data = {
+        # .array keeps the extension arrays (Arrow-backed strings from the
+        # CSV path, dictionary-encoded categoricals from Parquet) through
+        # the row filter; .to_numpy() would densify them to object-dtype
+        # arrays and force the category cast below to re-hash every string.
+        'state_name': df['state_name'].array[keep],
+        'state_abbreviation': df['state_abbreviation'].array[keep],
+        'county_name': df['county_name'].array[keep],
+        # int16 comfortably holds any study year and, like the float32 cost
+        # columns, halves the bytes the aggregations have to scan.
+        'year': studyyear[keep].astype(np.int16),
+    }
+    for j, age in enumerate(ages):
+        data[age] = costs[keep, j]
+    df_wide = pd.DataFrame(data)
+
+    if df_wide.empty:
+        return None
+
+    # Categorical dtypes: groupby then works on integer codes instead of
+    # hashing strings, and each unique label is stored only once in memory.
+    # county_name is by far the widest of these (~3000 uniques over the
+    # whole NDCP), so dictionary-encoding it is the biggest single saving.
+    for col in ('state_name', 'state_abbreviation', 'county_name'):
+        # Dropping unused categories matters now that the filter preserves
+        # the source dictionaries: a label whose rows were all filtered out
+        # must not surface in the sidebar options.
+        df_wide[col] = (df_wide[col].astype('category')
+                        .cat.remove_unused_categories())
+
+    # Pre-aggregate at cache time: the charts and KPIs only ever need mean
+    # weekly cost per (year, state, age group), so interactive reruns can
+    # slice these small frames instead of re-running a groupby over all
+    # rows. Both reductions run through the jitted wide-matrix accumulator
+    # when numba is available; only the tiny results take tidy shape.
+    agg = state_year_age_mean(df_wide, ages)
+    nat_agg = year_age_mean(df_wide, ages)
+
+    # Built here, not per rerun: the rerun path just reads the cached tuple.
+    state_options = state_option_list(df_wide)
+
+    if cache_paths is not None:
+        try:
+            os.makedirs('.cache', exist_ok=True)
+            # Prune entries keyed to previous versions of the source file so
+            # the cache holds at most one generation per table
+            for name, path in cache_paths.items():
+                for old in glob.glob(os.path.join('.cache', f'{name}_*.parquet')):
+                    if old != path:
+                        os.remove(old)
+            df_wide.to_parquet(cache_paths['wide'], compression='zstd')
+            agg.to_parquet(cache_paths['agg'], compression='zstd')
+            nat_agg.to_parquet(cache_paths['nat_agg'], compression='zstd')
+        except Exception:
+            # Caching is best-effort; a read-only filesystem is fine
+            pass
+
+    # Year bounds for the slider: two scalars here instead of two full
+    # column scans on every rerun.
+    year_bounds = (int(nat_agg['year'].min()), int(nat_agg['year'].max()))
+
+    return (df_wide, agg, nat_agg, state_options, year_bounds,
+            build_kpi_table(agg, nat_agg))